@@ -3,8 +3,8 @@
 FastAPI application for WhisperX Timestamping API
 """
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Query
+from fastapi.responses import JSONResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 import tempfile
 import os
@@ -12,16 +12,31 @@ import shutil
 import json
 from pathlib import Path
 from timestammping import WhisperXAligner
+from profiling import (
+    REQUEST_ID_HEADER,
+    PROFILE_HEADER,
+    PROFILER_BACKEND,
+    PROFILE_SAMPLE_RATE,
+    request_id_var,
+    RequestIdFilter,
+    normalize_request_id,
+    should_profile,
+    profile_request,
+    find_profile
+)
 import uvicorn
 import torch
 import logging
 import traceback
 
-# Configure logging
+# Configure logging (force=True replaces the handler set up by timestammping on import)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] - %(message)s',
+    force=True
 )
+for handler in logging.getLogger().handlers:
+    handler.addFilter(RequestIdFilter())
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
@@ -38,8 +53,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[REQUEST_ID_HEADER],
 )
 
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Attach a request id (propagated from the caller when given) and decide whether to profile"""
+    request.state.request_id = normalize_request_id(request.headers.get(REQUEST_ID_HEADER))
+    request.state.profile = should_profile(request.headers.get(PROFILE_HEADER))
+    token = request_id_var.set(request.state.request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers[REQUEST_ID_HEADER] = request.state.request_id
+    return response
+
 # Check for CUDA availability
 device = "cuda" if torch.cuda.is_available() else "cpu"
 logger.info(f"Using device: {device}")
@@ -64,6 +93,7 @@ async def startup_event():
 
 @app.post("/align")
 async def align_audio_with_text(
+    request: Request,
     audio: UploadFile = File(...),
     text: str = Form(...),
     device_param: str = Form(None),
@@ -109,12 +139,13 @@ async def align_audio_with_text(
 
         # Determine which alignment method to use
         logger.info("Starting alignment process...")
-        if clean.lower() == "true":
-            # Generate clean sentence-level timestamps for image analysis
-            result = aligner.generate_clean_timestamps(temp_audio_path, text)
-        else:
-            # Generate word-level timestamps for karaoke subtitles
-            result = aligner.align_audio_with_text(temp_audio_path, text)
+        with profile_request(request.state.request_id, request.state.profile):
+            if clean.lower() == "true":
+                # Generate clean sentence-level timestamps for image analysis
+                result = aligner.generate_clean_timestamps(temp_audio_path, text)
+            else:
+                # Generate word-level timestamps for karaoke subtitles
+                result = aligner.align_audio_with_text(temp_audio_path, text)
         
         logger.info(f"Alignment completed. Success: {result.get('success', False)}")
 
@@ -143,6 +174,7 @@ async def align_audio_with_text(
 
 @app.post("/transcribe")
 async def transcribe_audio(
+    request: Request,
     audio: UploadFile = File(...),
     device_param: str = Form(None),
     model: str = Form("base"),
@@ -178,7 +210,8 @@ async def transcribe_audio(
 
         # Perform transcription and alignment
         logger.info("Starting transcription and alignment process...")
-        result = aligner.transcribe_and_align(temp_audio_path)
+        with profile_request(request.state.request_id, request.state.profile):
+            result = aligner.transcribe_and_align(temp_audio_path)
         logger.info(f"Transcription and alignment completed. Success: {result.get('success', False)}")
 
         # Clean up temp file
@@ -204,6 +237,28 @@ async def transcribe_audio(
                 pass
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/profiles/{request_id}")
+async def get_profile(request_id: str, fmt: str = Query("text", alias="format")):
+    """
+    Retrieve the profile captured for a request
+
+    Args:
+        request_id: Request id sent in the X-Request-ID header (or echoed back by the API)
+        fmt: "text" for a readable summary, "raw" for the .prof / Chrome trace file
+             (passed as the "format" query parameter)
+    """
+    if fmt not in ("text", "raw"):
+        raise HTTPException(status_code=400, detail="format must be 'text' or 'raw'")
+
+    profile_path = find_profile(request_id, fmt)
+    if profile_path is None:
+        raise HTTPException(status_code=404, detail=f"No profile found for request {request_id}")
+
+    if fmt == "text":
+        # No filename, so the summary is shown inline rather than downloaded
+        return FileResponse(profile_path, media_type="text/plain")
+    return FileResponse(profile_path, media_type="application/octet-stream", filename=profile_path.name)
+
 @app.get("/health")
 async def health_check():
     """
@@ -237,7 +292,9 @@ async def get_status():
             "model_name": None,
             "whisper_model_loaded": False,
             "align_model_loaded": False,
-            "cuda_available": torch.cuda.is_available()
+            "cuda_available": torch.cuda.is_available(),
+            "profiler": PROFILER_BACKEND,
+            "profile_sample_rate": PROFILE_SAMPLE_RATE
         }
     
     return {
@@ -246,7 +303,9 @@ async def get_status():
         "model_name": aligner.model_name,
         "whisper_model_loaded": aligner.model is not None,
         "align_model_loaded": aligner.align_model is not None,
-        "cuda_available": torch.cuda.is_available()
+        "cuda_available": torch.cuda.is_available(),
+        "profiler": PROFILER_BACKEND,
+        "profile_sample_rate": PROFILE_SAMPLE_RATE
     }
 
 @app.get("/")
@@ -265,6 +324,7 @@ async def root():
             "POST /transcribe": "Transcribe and align audio to get word-level timestamps",
             "GET /health": "Health check with detailed status",
             "GET /status": "Get current service status and loaded models",
+            "GET /profiles/{request_id}": "Retrieve the profile captured for a request (send X-Profile: true to enable)",
             "GET /": "API information"
         },
         "parameters": {
@@ -281,7 +341,14 @@ async def root():
                 "device_param": "Device to use (cpu/cuda)",
                 "model": "WhisperX model size (base, small, medium, large)",
                 "language": "Language code (default: en)"
+            },
+            "/profiles/{request_id}": {
+                "format": "'text' for a readable summary, 'raw' for the .prof / Chrome trace file"
             }
+        },
+        "headers": {
+            REQUEST_ID_HEADER: "Request id used in logs and profile names (generated if missing)",
+            PROFILE_HEADER: "'true' to profile this request"
         }
     }
 
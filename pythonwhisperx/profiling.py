@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Opt-in per-request profiling for the WhisperX Timestamping API
+
+A request is profiled when it carries the X-Profile header, or when it is
+picked by the server-wide sampling rate. Traces are written to a bounded
+profiles directory keyed by request id, so a slow video render on the Node
+side can be tied to the Python hot spots that caused it.
+
+Configuration (environment variables):
+    WHISPERX_PROFILER             "cprofile" (default) or "torch"
+    WHISPERX_PROFILE_SAMPLE_RATE  Fraction of requests to profile (default: 0)
+    WHISPERX_PROFILE_DIR          Where traces are stored, in a whisperx-traces
+                                  subdirectory (default: ./profiles)
+    WHISPERX_PROFILE_MAX_FILES    Number of profiled requests to keep (default: 50)
+    WHISPERX_PROFILE_MAX_BYTES    Total size of stored profiles (default: 1 GiB)
+"""
+
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import uuid
+import logging
+import traceback
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+PROFILE_HEADER = "X-Profile"
+
+# Raw trace artifact written by each backend, next to a "<request_id>.txt" summary
+_TRACE_SUFFIXES = {
+    "cprofile": ".prof",
+    "torch": ".trace.json",
+}
+
+
+def _env_number(name, default, parse):
+    """Read a numeric setting, falling back to the default if it does not parse"""
+    raw_value = os.getenv(name)
+    if raw_value is None:
+        return default
+    try:
+        return parse(raw_value)
+    except ValueError:
+        logger.warning(f"Invalid {name}={raw_value!r}, using default {default}")
+        return default
+
+
+def _env_profiler():
+    """Read WHISPERX_PROFILER, falling back to cProfile if it names an unknown backend"""
+    backend = os.getenv("WHISPERX_PROFILER", "cprofile").strip().lower()
+    if backend not in _TRACE_SUFFIXES:
+        logger.warning(f"Unknown WHISPERX_PROFILER={backend!r}, using cprofile")
+        return "cprofile"
+    return backend
+
+
+PROFILER_BACKEND = _env_profiler()
+PROFILE_SAMPLE_RATE = _env_number("WHISPERX_PROFILE_SAMPLE_RATE", 0.0, float)
+# Traces live in their own subdirectory, so pruning never touches other files under the configured path
+PROFILE_DIR = Path(os.getenv("WHISPERX_PROFILE_DIR", Path(__file__).parent / "profiles")) / "whisperx-traces"
+# The most recent profile is always kept, even if it alone exceeds the size cap
+PROFILE_MAX_FILES = max(_env_number("WHISPERX_PROFILE_MAX_FILES", 50, int), 1)
+PROFILE_MAX_BYTES = max(_env_number("WHISPERX_PROFILE_MAX_BYTES", 1024 ** 3, int), 0)
+
+# Request id of the request being handled, picked up by RequestIdFilter for every log line
+request_id_var = contextvars.ContextVar("request_id", default="-")
+
+# Request ids end up in file names, so keep them to a safe character set
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+
+def normalize_request_id(raw_id):
+    """Return the caller's request id if it is usable, otherwise a fresh one"""
+    if raw_id and _REQUEST_ID_PATTERN.match(raw_id):
+        return raw_id
+    if raw_id:
+        logger.warning(f"Ignoring malformed request id: {raw_id[:64]!r}")
+    return uuid.uuid4().hex
+
+
+class RequestIdFilter(logging.Filter):
+    """Expose the current request id to log formats as %(request_id)s"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+def should_profile(header_value):
+    """Decide whether a request is profiled, from its X-Profile header or the sampling rate"""
+    if header_value is not None and header_value.strip().lower() in ("1", "true", "yes", "on"):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+@contextmanager
+def profile_request(request_id, enabled):
+    """
+    Profile the enclosed block and store the trace under PROFILE_DIR
+
+    Profiling failures are logged and never fail the request itself.
+    """
+    if not enabled:
+        yield
+        return
+
+    _clear_profile(request_id)
+    backend = _torch_profile if PROFILER_BACKEND == "torch" else _cprofile_profile
+    try:
+        with backend(request_id):
+            yield
+    finally:
+        _prune_profiles()
+
+
+@contextmanager
+def _cprofile_profile(request_id):
+    logger.info("Profiling request with cProfile")
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        try:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(PROFILE_DIR / f"{request_id}.prof"))
+
+            summary = io.StringIO()
+            stats = pstats.Stats(profiler, stream=summary)
+            stats.sort_stats("cumulative").print_stats(50)
+            (PROFILE_DIR / f"{request_id}.txt").write_text(summary.getvalue())
+            logger.info(f"Profile saved to {PROFILE_DIR}")
+        except Exception as e:
+            logger.error(f"Failed to save cProfile trace: {e}")
+            logger.error(traceback.format_exc())
+
+
+@contextmanager
+def _torch_profile(request_id):
+    import torch
+    from torch.profiler import profile, ProfilerActivity
+
+    logger.info("Profiling request with torch.profiler")
+    activities = [ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(ProfilerActivity.CUDA)
+
+    prof = profile(activities=activities, record_shapes=True)
+    prof.start()
+    try:
+        yield
+    finally:
+        prof.stop()
+        try:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            prof.export_chrome_trace(str(PROFILE_DIR / f"{request_id}.trace.json"))
+
+            sort_by = "cuda_time_total" if torch.cuda.is_available() else "cpu_time_total"
+            summary = prof.key_averages().table(sort_by=sort_by, row_limit=50)
+            (PROFILE_DIR / f"{request_id}.txt").write_text(summary)
+            logger.info(f"Profile saved to {PROFILE_DIR}")
+        except Exception as e:
+            logger.error(f"Failed to save torch.profiler trace: {e}")
+            logger.error(traceback.format_exc())
+
+
+def _clear_profile(request_id):
+    """Remove any earlier profile stored under this request id, so reused ids never mix traces"""
+    try:
+        if not PROFILE_DIR.is_dir():
+            return
+        for file_request_id, path in _profile_files():
+            if file_request_id == request_id:
+                _remove_file(path)
+    except OSError as e:
+        logger.warning(f"Failed to clear earlier profile: {e}")
+
+
+def _profile_files():
+    """
+    Yield (request_id, path) for every profile file in PROFILE_DIR
+
+    Anything that is not a regular file named <request_id>.txt/.prof/.trace.json
+    is skipped, so unrelated files are never pruned.
+    """
+    known_suffixes = {".txt", *_TRACE_SUFFIXES.values()}
+    for path in PROFILE_DIR.iterdir():
+        request_id, dot, suffix = path.name.partition(".")
+        if (
+            dot
+            and f".{suffix}" in known_suffixes
+            and _REQUEST_ID_PATTERN.match(request_id)
+            and path.is_file()
+        ):
+            yield request_id, path
+
+
+def _remove_file(path):
+    """Delete a profile file, logging instead of raising on failure"""
+    try:
+        path.unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning(f"Failed to remove profile file {path}: {e}")
+
+
+def _prune_profiles():
+    """Delete the oldest profiles until at most PROFILE_MAX_FILES requests and PROFILE_MAX_BYTES remain"""
+    profiles = {}
+    latest = {}
+    sizes = {}
+    try:
+        for request_id, path in _profile_files():
+            try:
+                stat = path.stat()
+            except OSError as e:
+                logger.warning(f"Failed to stat profile file {path}: {e}")
+                continue
+            profiles.setdefault(request_id, []).append(path)
+            latest[request_id] = max(latest.get(request_id, 0), stat.st_mtime)
+            sizes[request_id] = sizes.get(request_id, 0) + stat.st_size
+    except OSError as e:
+        logger.warning(f"Failed to list profiles directory: {e}")
+        return
+
+    oldest_first = sorted(profiles, key=latest.get)
+    total_bytes = sum(sizes.values())
+    while len(oldest_first) > 1 and (
+        len(oldest_first) > PROFILE_MAX_FILES or total_bytes > PROFILE_MAX_BYTES
+    ):
+        request_id = oldest_first.pop(0)
+        for path in profiles[request_id]:
+            _remove_file(path)
+        total_bytes -= sizes[request_id]
+        logger.info(f"Pruned old profile: {request_id}")
+
+
+def find_profile(request_id, fmt="text"):
+    """
+    Locate a stored profile for a request
+
+    Args:
+        request_id: Request id the profile was recorded under
+        fmt: "text" for the human-readable summary, "raw" for the trace file of the
+             active profiler (.prof for cProfile, Chrome trace .trace.json for torch.profiler)
+
+    Returns:
+        Path to the profile file, or None if it does not exist
+    """
+    if not _REQUEST_ID_PATTERN.match(request_id):
+        return None
+
+    suffix = ".txt" if fmt == "text" else _TRACE_SUFFIXES[PROFILER_BACKEND]
+    path = PROFILE_DIR / f"{request_id}{suffix}"
+    return path if path.is_file() else None
@@ -296,7 +296,7 @@ export const generateVideoWithSubtitles = async (req: Request, res: Response) =>
               });
 
               // Get word-level timestamps using WhisperX API
-              const wordTimestamps = await getWhisperXAlignment(dialogue.audioFile.filePath, dialogue.text);
+              const wordTimestamps = await getWhisperXAlignment(dialogue.audioFile.filePath, dialogue.text, `${sessionId}-${i}`);
 
               // Adjust timestamps to cumulative timeline
               const adjustedWords = wordTimestamps.map(word => ({
@@ -542,7 +542,7 @@ export const generateVideoWithSubtitles = async (req: Request, res: Response) =>
             });
 
             // Get word-level timestamps using WhisperX API
-            const wordTimestamps = await getWhisperXAlignment(dialogue.audioFile.filePath, dialogue.text);
+            const wordTimestamps = await getWhisperXAlignment(dialogue.audioFile.filePath, dialogue.text, `${sessionId}-${i}`);
 
             // Adjust timestamps to cumulative timeline
             const adjustedWords = wordTimestamps.map(word => ({
@@ -1721,7 +1721,7 @@ export const analyzeUserImages = async (req: Request, res: Response) => {
             });
 
             // Get word-level timestamps using WhisperX API
-            const wordTimestamps = await getWhisperXAlignment(dialogue.audioFile.filePath, dialogue.text);
+            const wordTimestamps = await getWhisperXAlignment(dialogue.audioFile.filePath, dialogue.text, `${sessionId}-${i}`);
 
             // Adjust timestamps to cumulative timeline
             const adjustedWords = wordTimestamps.map(word => ({
@@ -1998,7 +1998,7 @@ export const getAssContent = async (req: Request, res: Response) => {
           });
 
           // Get word-level timestamps using WhisperX API
-          const wordTimestamps = await getWhisperXAlignment(dialogue.audioFile.filePath, dialogue.text);
+          const wordTimestamps = await getWhisperXAlignment(dialogue.audioFile.filePath, dialogue.text, `${sessionId}-${i}`);
 
           // Adjust timestamps to cumulative timeline
           const adjustedWords = wordTimestamps.map(word => ({
@@ -1229,10 +1229,11 @@ export class ImageEmbeddingService {
 
       let totalDuration = 0;
 
-      for (const dialogue of dialogues) {
+      for (let i = 0; i < dialogues.length; i++) {
+        const dialogue = dialogues[i];
         console.log(` [SERVICE] Processing clean alignment for: "${dialogue.text.substring(0, 50)}..."`);
 
-        const cleanResult = await getWhisperXCleanAlignment(dialogue.audioFile.filePath, dialogue.text);
+        const cleanResult = await getWhisperXCleanAlignment(dialogue.audioFile.filePath, dialogue.text, `${sessionId}-clean-${i}`);
 
         if (cleanResult.success && cleanResult.sentences) {
           const adjustedSentences = cleanResult.sentences.map(sentence => ({
@@ -13,6 +13,20 @@ const prisma = new PrismaClient();
 
 // WhisperX API configuration
 const WHISPERX_API_URL = 'http://127.0.0.1:6000'; // Adjust this URL as needed
+// Set WHISPERX_PROFILE=true to capture a profile for every WhisperX request (see GET /profiles/:requestId)
+const WHISPERX_PROFILE = process.env.WHISPERX_PROFILE === 'true';
+
+// Headers that tie a WhisperX request back to the video render that issued it
+function whisperXRequestHeaders(requestId?: string): Record<string, string> {
+  const headers: Record<string, string> = {};
+  if (requestId) {
+    headers['X-Request-ID'] = requestId;
+  }
+  if (WHISPERX_PROFILE) {
+    headers['X-Profile'] = 'true';
+  }
+  return headers;
+}
 
 // Set ffmpeg path
 const ffmpegPath = ffmpegInstaller.path;
@@ -136,8 +150,8 @@ export interface DialogueTimestamp {
 }
 
 // WhisperX alignment function using FastAPI
-export async function getWhisperXAlignment(audioPath: string, text: string): Promise<WordTimestamp[]> {
-  console.log(' [ALIGNMENT] Starting WhisperX alignment via API for:', path.basename(audioPath));
+export async function getWhisperXAlignment(audioPath: string, text: string, requestId?: string): Promise<WordTimestamp[]> {
+  console.log(' [ALIGNMENT] Starting WhisperX alignment via API for:', path.basename(audioPath), requestId ? `(request ${requestId})` : '');
 
   try {
     // First, check if WhisperX API is available
@@ -172,6 +186,7 @@ export async function getWhisperXAlignment(audioPath: string, text: string): Pro
     const response = await axios.post(`${WHISPERX_API_URL}/align`, formData, {
       headers: {
         ...formData.getHeaders(),
+        ...whisperXRequestHeaders(requestId),
         'Content-Type': `multipart/form-data; boundary=${formData.getBoundary()}`
       },
       timeout: 120000 // 2 minutes timeout for processing
@@ -327,7 +342,7 @@ function groupWordsIntoSentences(words: WordTimestamp[], originalText: string):
 }
 
 // NEW: WhisperX clean alignment function for image analysis - generates sentence-level timestamps
-export async function getWhisperXCleanAlignment(audioPath: string, text: string): Promise<{
+export async function getWhisperXCleanAlignment(audioPath: string, text: string, requestId?: string): Promise<{
   success: boolean;
   sentences?: Array<{
     text: string;
@@ -337,7 +352,7 @@ export async function getWhisperXCleanAlignment(audioPath: string, text: string)
   total_duration?: number;
   error?: string;
 }> {
-  console.log('🖼️ [CLEAN ALIGNMENT] Starting WhisperX clean sentence-level alignment for image analysis:', path.basename(audioPath));
+  console.log('🖼️ [CLEAN ALIGNMENT] Starting WhisperX clean sentence-level alignment for image analysis:', path.basename(audioPath), requestId ? `(request ${requestId})` : '');
 
   try {
     // First, check if WhisperX API is available
@@ -375,6 +390,7 @@ export async function getWhisperXCleanAlignment(audioPath: string, text: string)
     const response = await axios.post(`${WHISPERX_API_URL}/align`, formData, {
       headers: {
         ...formData.getHeaders(),
+        ...whisperXRequestHeaders(requestId),
         'Content-Type': `multipart/form-data; boundary=${formData.getBoundary()}`
       },
       timeout: 120000 // 2 minutes timeout
@@ -390,7 +406,7 @@ export async function getWhisperXCleanAlignment(audioPath: string, text: string)
         console.log(' [CLEAN ALIGNMENT] No sentences returned, falling back to word timestamps grouping');
         
         // Get regular word timestamps
-        const wordResult = await getWhisperXAlignment(audioPath, text);
+        const wordResult = await getWhisperXAlignment(audioPath, text, requestId && `${requestId}-words`);
         
         if (wordResult && wordResult.length > 0) {
           // Group words into sentences
@@ -757,7 +773,7 @@ export async function generateVideoWithSubtitles(
         });
 
         // Get word-level timestamps
-        const wordTimestamps = await getWhisperXAlignment(dialogue.audioFile.filePath, dialogue.text);
+        const wordTimestamps = await getWhisperXAlignment(dialogue.audioFile.filePath, dialogue.text, `${sessionId}-${i}`);
 
         // Adjust timestamps to cumulative timeline
         const adjustedWords = wordTimestamps.map(word => ({